@@ -1,6 +1,12 @@
+import os
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
+import pyarrow.parquet as pq
+
+# Copy-on-write lets slices and .assign share data instead of making defensive copies
+pd.options.mode.copy_on_write = True
 
 # Set Streamlit page configuration
 st.set_page_config(page_title="Utility Dashboard", layout="wide")
@@ -15,57 +21,237 @@ st.sidebar.header("Filter Options")
 default_commodity_file = 'utility.xlsx'  # Update with your file path
 default_temperature_file = 'tempdata.xlsx'  # Update with your file path
 
-# Load the datasets with caching
-@st.cache_data
-def load_data(file_path):
-    return pd.read_excel(file_path)
-
-data_commodity = load_data(default_commodity_file)
-data_temperature = load_data(default_temperature_file)
-
-# Ensure 'BillStartDate' and 'BillEndDate' are in datetime format in the commodity dataset
+# Columns the dashboard reads from each dataset; everything else is skipped at load time
+commodity_columns = ['ComplexName', 'Commodity', 'BuildingName', 'MeterName', 'PrimaryUse', 'Units', 'Year',
+                     'BuildingSizeSQFT', 'BillStartDate', 'BillEndDate', 'TotalConsumption', 'TotalCost']
+temperature_columns = ['Year-month', 'TAVG']
+
+# Month abbreviations in calendar order, indexed by month number - 1
+month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Prefer the Parquet copy of a dataset written by build_parquet.py
+def table_path(file_path):
+    parquet_path = os.path.splitext(file_path)[0] + '.parquet'
+    return parquet_path if os.path.exists(parquet_path) else file_path
+
+# Read only the requested columns that exist in the file
+def read_table(file_path, columns):
+    path = table_path(file_path)
+    if path.endswith('.parquet'):
+        available = set(pq.read_schema(path).names)
+        return pd.read_parquet(path, engine='pyarrow', columns=[col for col in columns if col in available])
+    return pd.read_excel(path, usecols=lambda col: col in columns)
+
+# Modification time of the file a dataset is read from, used to invalidate the cached loaders
+def source_mtime(file_path):
+    return os.path.getmtime(table_path(file_path))
+
+# Load and clean the datasets, persisted to disk so restarts skip parsing the files
+@st.cache_data(persist="disk", show_spinner="Loading utility data…")
+def load_commodity(file_path, mtime):
+    df = read_table(file_path, commodity_columns)
+    # Ensure 'BillStartDate' and 'BillEndDate' are in datetime format
+    for date_col in ['BillStartDate', 'BillEndDate']:
+        if date_col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
+    # Store the filter and grouping columns as categoricals so comparisons and groupbys use integer codes
+    for cat_col in ['ComplexName', 'Commodity', 'BuildingName', 'MeterName', 'PrimaryUse']:
+        if cat_col in df.columns:
+            df[cat_col] = df[cat_col].astype('category')
+    # Dashboard aggregates don't need 64-bit precision; smaller dtypes halve the memory scanned
+    for num_col in ['TotalConsumption', 'TotalCost', 'BuildingSizeSQFT']:
+        if num_col in df.columns:
+            df[num_col] = df[num_col].astype('float32')
+    if 'Year' in df.columns:
+        df['Year'] = df['Year'].astype('int16')
+    return df
+
+@st.cache_data(persist="disk", show_spinner="Loading temperature data…")
+def load_temperature(file_path, mtime):
+    df = read_table(file_path, temperature_columns)
+    # Parse 'Year-month' into a timestamp so it can be joined against the billing data
+    if 'Year-month' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Year-month']):
+        df['Year-month'] = pd.to_datetime(df['Year-month'], format='%Y-%m')
+    return df
+
+# (commodity mtime, temperature mtime); passed to every cached function built on the loaders
+# so their entries are invalidated together with the loaders when either file changes
+data_version = (source_mtime(default_commodity_file), source_mtime(default_temperature_file))
+
+data_commodity = load_commodity(default_commodity_file, data_version[0])
+data_temperature = load_temperature(default_temperature_file, data_version[1])
+
+# Make sure the commodity dataset has the billing period columns
 for date_col in ['BillStartDate', 'BillEndDate']:
-    if date_col in data_commodity.columns:
-        data_commodity[date_col] = pd.to_datetime(data_commodity[date_col], errors='coerce')
-    else:
+    if date_col not in data_commodity.columns:
         st.error(f"Column '{date_col}' not found in the commodity dataset.")
         st.stop()
 
-# Extract 'TAVG' (temperature) and 'Year-month' from the temperature dataset
-if 'Year-month' in data_temperature.columns and 'TAVG' in data_temperature.columns:
-    data_temperature['Year-month'] = pd.to_datetime(data_temperature['Year-month'], format='%Y-%m')
-else:
+# Make sure the temperature dataset has 'TAVG' (temperature) and 'Year-month'
+if 'Year-month' not in data_temperature.columns or 'TAVG' not in data_temperature.columns:
     st.error("The temperature dataset must contain 'Year-month' and 'TAVG' columns.")
     st.stop()
 
-# Campus selection (always required)
-selected_campus = st.sidebar.selectbox('Select Campus', sorted(data_commodity['ComplexName'].dropna().unique()))
+# Average temperature keyed by month, used as a lookup table for the billing data
+@st.cache_data(show_spinner=False)
+def load_tavg_by_month(file_path, mtime):
+    df = load_temperature(file_path, mtime)
+    return df.drop_duplicates('Year-month').set_index('Year-month')['TAVG']
+
+
+# Select the bills matching the sidebar filters:
+# (campus, commodity, buildings, meters, year range); None or empty skips a filter
+def select_bills(df, filters):
+    campus, commodity, buildings, meters, year_range = filters
+    mask = df['ComplexName'] == campus
+    if commodity is not None:
+        mask &= df['Commodity'] == commodity
+    if buildings:
+        mask &= df['BuildingName'].isin(buildings)
+    if meters:
+        mask &= df['MeterName'].isin(meters)
+    if year_range:
+        mask &= df['Year'].between(year_range[0], year_range[1])
+    return df[mask]
+
+# Sorted values of a column for the bills matching the filters chosen so far
+@st.cache_data(show_spinner=False)
+def available_options(column, filters, data_version):
+    values = select_bills(load_commodity(default_commodity_file, data_version[0]), filters)[column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Categories are already sorted and never contain NaN
+        return values.cat.remove_unused_categories().cat.categories.tolist()
+    return np.sort(values.dropna().unique()).tolist()
+
+# Element-wise float32 division that yields 0 wherever the denominator is 0
+def safe_divide(numerator, denominator):
+    numerator = np.asarray(numerator, dtype='float32')
+    denominator = np.asarray(denominator, dtype='float32')
+    return np.where(denominator == 0, np.float32(0), numerator / np.where(denominator == 0, np.float32(1), denominator))
+
+# Filter the bills and split each one into the calendar months it covers, cached per filter
+# selection. Every normalization is computed up front so switching methods is just a lookup
+@st.cache_data(show_spinner=False)
+def load_monthly_consumption(filters, data_version):
+    filtered_data = select_bills(load_commodity(default_commodity_file, data_version[0]), filters)
+    tavg_by_month = load_tavg_by_month(default_temperature_file, data_version[1])
+
+    # Keep only the columns the visualizations need before splitting the bills into months, and
+    # derive the per-bill values in one .assign so the slice is never modified in place.
+    # BillDays is 0 for missing or reversed dates
+    bill_columns = ['Year', 'BuildingName', 'PrimaryUse', 'BuildingSizeSQFT',
+                    'BillStartDate', 'BillEndDate', 'TotalConsumption', 'TotalCost']
+    bills = filtered_data[[col for col in bill_columns if col in filtered_data.columns]].assign(
+        BillDays=lambda d: np.clip((d['BillEndDate'] - d['BillStartDate']).dt.days.fillna(-1).to_numpy().astype(int) + 1, 0, None),
+        DailyConsumption=lambda d: safe_divide(d['TotalConsumption'], d['BillDays']),
+        DailyCost=lambda d: safe_divide(d['TotalCost'], d['BillDays']),
+    )
+    days = bills['BillDays'].to_numpy()
+
+    # Number of calendar months each bill touches (bills without any billing days are dropped)
+    start_month = bills['BillStartDate'].to_numpy().astype('datetime64[M]')
+    end_month = bills['BillEndDate'].to_numpy().astype('datetime64[M]')
+    months = np.where(days > 0, (end_month - start_month).astype(int) + 1, 0)
+
+    # Expand each bill into one row per month it covers
+    idx = np.repeat(np.arange(len(bills)), months)
+    offsets = np.arange(months.sum()) - np.repeat(np.cumsum(months) - months, months)
+    month_start = start_month[idx] + offsets.astype('timedelta64[M]')
+
+    # Days of the bill that fall in each month, used to prorate the bill across its months
+    segment_start = np.maximum(month_start.astype('datetime64[D]'), bills['BillStartDate'].to_numpy()[idx].astype('datetime64[D]'))
+    segment_end = np.minimum((month_start + 1).astype('datetime64[D]') - 1, bills['BillEndDate'].to_numpy()[idx].astype('datetime64[D]'))
+
+    bill_months = bills.iloc[idx].reset_index(drop=True).assign(**{
+        'Year-month': month_start.astype('datetime64[ns]'),
+        # int16 so multiplying the float32 daily values keeps them float32
+        'DaysInMonth': ((segment_end - segment_start).astype(int) + 1).astype('int16'),
+    })
+    bill_months = bill_months.assign(
+        Month=lambda d: d['Year-month'].dt.month,
+        MonthlyConsumption=lambda d: d['DailyConsumption'] * d['DaysInMonth'],
+        MonthlyCost=lambda d: d['DailyCost'] * d['DaysInMonth'],
+        # Look up the temperature for each month based on 'Year-month'
+        TAVG=lambda d: d['Year-month'].map(tavg_by_month),
+        WeatherNormalizedConsumption=lambda d: safe_divide(d['MonthlyConsumption'], d['TAVG']),
+    )
+
+    # Energy Use Intensity of the prorated consumption
+    if 'BuildingSizeSQFT' in bill_months.columns:
+        bill_months['EUIConsumption'] = safe_divide(bill_months['MonthlyConsumption'], bill_months['BuildingSizeSQFT'])
+
+    return bill_months
+
+# Aggregate the bill-months once per filter selection and y column; each visualization then
+# re-sums this small frame instead of grouping the bill-months again
+@st.cache_data(show_spinner=False)
+def aggregate_base(filters, y_col, data_version):
+    df = load_monthly_consumption(filters, data_version)
+    keys = [col for col in ['Year-month', 'Year', 'Month', 'BuildingName', 'PrimaryUse', 'BuildingSizeSQFT'] if col in df.columns]
+    return df.groupby(keys, observed=True, sort=False, dropna=False).agg(**{
+        y_col: (y_col, 'sum'),
+        'TotalCost': ('MonthlyCost', 'sum')
+    }).reset_index()
+
+# Aggregations behind each visualization, cached per filter selection and y column
+@st.cache_data(show_spinner=False)
+def aggregate_by_month(filters, y_col, data_version):
+    base = aggregate_base(filters, y_col, data_version)
+    return base.groupby('Year-month')[[y_col]].sum().reset_index()
+
+@st.cache_data(show_spinner=False)
+def aggregate_by_building_month(filters, y_col, data_version):
+    base = aggregate_base(filters, y_col, data_version)
+    return base.groupby(['Year', 'Month', 'BuildingName'], observed=True)[y_col].sum().reset_index()
+
+@st.cache_data(show_spinner=False)
+def aggregate_by_primary_use(filters, y_col, data_version):
+    base = aggregate_base(filters, y_col, data_version)
+    return base.groupby(['Year', 'PrimaryUse'], observed=True)[y_col].sum().reset_index()
+
+@st.cache_data(show_spinner=False)
+def aggregate_by_building(filters, y_col, data_version):
+    base = aggregate_base(filters, y_col, data_version)
+    return base.groupby('BuildingName', observed=True, sort=False).agg({
+        y_col: 'sum',
+        'TotalCost': 'sum',
+        'BuildingSizeSQFT': 'first'
+    }).reset_index()
 
-# Filter data by selected campus to get available commodities, buildings, meters, and years
-filtered_campus_data = data_commodity[data_commodity['ComplexName'] == selected_campus]
+# Downsample a time series with M4 aggregation: keep the first, last, min and max point of
+# each of `width` x-buckets so the line keeps its shape with far fewer points to draw
+def m4_downsample(df, x, y, width=800):
+    if len(df) <= 4 * width:
+        return df
+    x_values = df[x].astype('int64')
+    bucket_size = max((x_values.max() - x_values.min()) // width, 1)
+    buckets = (x_values - x_values.min()) // bucket_size
+    grouped = df.groupby(buckets)[y]
+    keep = pd.concat([
+        grouped.idxmin().dropna(),
+        grouped.idxmax().dropna(),
+        grouped.head(1).index.to_series(),
+        grouped.tail(1).index.to_series(),
+    ]).unique()
+    return df.loc[np.sort(keep)]
+
+# Campus selection (always required)
+selected_campus = st.sidebar.selectbox('Select Campus', data_commodity['ComplexName'].cat.categories.tolist())
 
 # Commodity selection (filtered based on the selected campus)
-available_commodities = sorted(filtered_campus_data['Commodity'].dropna().unique())
+available_commodities = available_options('Commodity', (selected_campus, None, (), (), None), data_version)
 selected_commodity = st.sidebar.selectbox('Select Commodity', available_commodities)
 
-# Filter the dataset based on the selected commodity
-commodity_filtered_data = filtered_campus_data[filtered_campus_data['Commodity'] == selected_commodity]
-
 # Building Name selection (filtered based on selected commodity)
-available_buildings = sorted(commodity_filtered_data['BuildingName'].dropna().unique())
+available_buildings = available_options('BuildingName', (selected_campus, selected_commodity, (), (), None), data_version)
 selected_buildings = st.sidebar.multiselect('Select Building(s) (Optional)', available_buildings, default=[])
 
 # Meter Name selection (filtered based on selected building(s))
-if selected_buildings:
-    building_filtered_data = commodity_filtered_data[commodity_filtered_data['BuildingName'].isin(selected_buildings)]
-else:
-    building_filtered_data = commodity_filtered_data
-
-available_meters = sorted(building_filtered_data['MeterName'].dropna().unique())
+available_meters = available_options('MeterName', (selected_campus, selected_commodity, tuple(selected_buildings), (), None), data_version)
 selected_meters = st.sidebar.multiselect('Select Meter(s) (Optional)', available_meters, default=[])
 
 # Horizontal Slider for Year selection
-available_years = sorted(building_filtered_data['Year'].dropna().unique())
+available_years = available_options('Year', (selected_campus, selected_commodity, tuple(selected_buildings), tuple(selected_meters), None), data_version)
 if available_years:
     min_year, max_year = int(min(available_years)), int(max(available_years))
     selected_year_range = st.slider(
@@ -74,10 +260,11 @@ if available_years:
         (min_year, max_year),
         step=1
     )
-    selected_years = list(range(selected_year_range[0], selected_year_range[1] + 1))
-    filtered_data = building_filtered_data[building_filtered_data['Year'].isin(selected_years)]
 else:
-    filtered_data = building_filtered_data
+    selected_year_range = None
+
+filters = (selected_campus, selected_commodity, tuple(selected_buildings), tuple(selected_meters), selected_year_range)
+filtered_data = select_bills(data_commodity, filters)
 
 # Handle the case when no data is available after filtering
 if filtered_data.empty:
@@ -94,33 +281,6 @@ elif len(units) > 1:
 else:
     unit = "Units"
 
-# Create a date range for each billing period
-filtered_data['DateRange'] = filtered_data.apply(
-    lambda row: pd.date_range(start=row['BillStartDate'], end=row['BillEndDate']).tolist(),
-    axis=1
-)
-
-# Explode the date range into individual dates
-df_exploded = filtered_data.explode('DateRange')
-
-# Calculate the number of billing days
-df_exploded['BillDays'] = (df_exploded['BillEndDate'] - df_exploded['BillStartDate']).dt.days + 1
-
-# Handle division by zero or missing 'BillDays'
-df_exploded['BillDays'] = df_exploded['BillDays'].replace(0, pd.NA)
-
-# Divide TotalConsumption and TotalCost by BillDays to get daily values
-df_exploded['DailyConsumption'] = df_exploded['TotalConsumption'] / df_exploded['BillDays']
-df_exploded['DailyCost'] = df_exploded['TotalCost'] / df_exploded['BillDays']
-
-# Fill NaN values resulting from division by zero
-df_exploded['DailyConsumption'] = df_exploded['DailyConsumption'].fillna(0)
-df_exploded['DailyCost'] = df_exploded['DailyCost'].fillna(0)
-
-# Merge the temperature data based on 'Year-Month'
-df_exploded['Year-month'] = df_exploded['DateRange'].dt.to_period('M').dt.to_timestamp()
-df_exploded = pd.merge(df_exploded, data_temperature[['Year-month', 'TAVG']], on='Year-month', how='left')
-
 # Add a radio button to allow users to select the normalization method
 normalization_method = st.sidebar.radio(
     "Choose Normalization Method",
@@ -128,178 +288,184 @@ normalization_method = st.sidebar.radio(
 )
 
 # Select the appropriate data based on the user's selection
-if normalization_method == "Weather Normalized Energy Use" and 'TAVG' in df_exploded.columns:
-    df_exploded['TAVG'] = df_exploded['TAVG'].replace(0, pd.NA)  # Avoid division by zero
-    df_exploded['NormalizedConsumption'] = df_exploded['TotalConsumption'] / df_exploded['TAVG']
-    df_exploded['NormalizedConsumption'] = df_exploded['NormalizedConsumption'].fillna(0)  # Handle any NaN values
-    y_axis_column = 'NormalizedConsumption'
+if normalization_method == "Weather Normalized Energy Use":
+    y_axis_column = 'WeatherNormalizedConsumption'
     y_axis_title = f'Normalized Consumption ({unit} / celsius)'
-elif normalization_method == "Energy Use Intensity (EUI)" and 'BuildingSizeSQFT' in df_exploded.columns:
-    df_exploded['BuildingSizeSQFT'] = df_exploded['BuildingSizeSQFT'].replace(0, pd.NA)  # Avoid division by zero
-    df_exploded['NormalizedConsumption'] = df_exploded['TotalConsumption'] / df_exploded['BuildingSizeSQFT']
-    df_exploded['NormalizedConsumption'] = df_exploded['NormalizedConsumption'].fillna(0)
-    y_axis_column = 'NormalizedConsumption'
+elif normalization_method == "Energy Use Intensity (EUI)" and 'BuildingSizeSQFT' in filtered_data.columns:
+    y_axis_column = 'EUIConsumption'
     y_axis_title = f'Normalized Consumption ({unit} / SQFT)'
 else:
-    y_axis_column = 'TotalConsumption'
+    y_axis_column = 'MonthlyConsumption'
     y_axis_title = f'Total Consumption ({unit})'
 
 # ---- First Visualization: Time Series plot with full date axis ----
-st.header(f"{y_axis_title} Over Time (Monthly Aggregation)")
-st.write("This time series visualization shows the consumption of the selected commodity over time, aggregated by month.")
-consumption_by_month = df_exploded.groupby('Year-month')[[y_axis_column]].sum().reset_index()
-if not consumption_by_month.empty:
-    time_series_fig = px.line(
-        consumption_by_month,
-        x='Year-month',
-        y=y_axis_column,
-        title=f"{y_axis_title} of {selected_commodity} for {selected_campus} Over Time",
-        markers=True
-    )
+# Each visualization runs as a fragment so its reruns are scoped to that block
+@st.fragment
+def render_consumption_over_time(filters, y_axis_column, y_axis_title, data_version):
+    selected_campus, selected_commodity = filters[0], filters[1]
+    st.header(f"{y_axis_title} Over Time (Monthly Aggregation)")
+    st.write("This time series visualization shows the consumption of the selected commodity over time, aggregated by month.")
+    consumption_by_month = aggregate_by_month(filters, y_axis_column, data_version)
+    if not consumption_by_month.empty:
+        time_series_fig = px.line(
+            m4_downsample(consumption_by_month, 'Year-month', y_axis_column),
+            x='Year-month',
+            y=y_axis_column,
+            title=f"{y_axis_title} of {selected_commodity} for {selected_campus} Over Time",
+            markers=True,
+            render_mode='webgl'
+        )
 
-    # Customize the layout
-    time_series_fig.update_layout(
-        xaxis_title='Month',
-        yaxis_title=y_axis_title,
-        xaxis_tickangle=-45,  # Rotate x-axis labels
-        showlegend=False,
-        plot_bgcolor='rgba(0,0,0,0)',  # Transparent background
-        title={'x': 0.5, 'xanchor': 'center'},  # Center the title
-        xaxis=dict(showgrid=True),
-        yaxis=dict(showgrid=True),
-    )
+        # Customize the layout
+        time_series_fig.update_layout(
+            xaxis_title='Month',
+            yaxis_title=y_axis_title,
+            xaxis_tickangle=-45,  # Rotate x-axis labels
+            showlegend=False,
+            plot_bgcolor='rgba(0,0,0,0)',  # Transparent background
+            title={'x': 0.5, 'xanchor': 'center'},  # Center the title
+            xaxis=dict(showgrid=True),
+            yaxis=dict(showgrid=True),
+        )
 
-    # Display the time series plot
-    st.plotly_chart(time_series_fig, use_container_width=True)
-else:
-    st.info(f"No data available for the {y_axis_title} Time Series visualization.")
+        # Display the time series plot
+        st.plotly_chart(time_series_fig, use_container_width=True)
+    else:
+        st.info(f"No data available for the {y_axis_title} Time Series visualization.")
+
+render_consumption_over_time(filters, y_axis_column, y_axis_title, data_version)
 
 # ---- Second Visualization: Clustered bar chart of TotalConsumption across months, clustered by year ----
-st.header(f"Monthly {y_axis_title} by Building for {selected_commodity} - {selected_campus}")
-st.write("This clustered bar chart compares the monthly consumption of the selected commodity for different buildings, grouped by month.")
-
-# Ensure months are in the correct order (January to December)
-df_exploded['Month'] = df_exploded['DateRange'].dt.month
-
-# Group by 'Month', 'BuildingName', and 'Year' to get the monthly consumption for each building per year
-monthly_consumption_building = df_exploded.groupby(['Year', 'Month', 'BuildingName'])[y_axis_column].sum().reset_index()
-
-# Map numeric months to their names
-monthly_consumption_building['Month'] = monthly_consumption_building['Month'].map({
-    1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
-    7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
-})
-
-# Create a grouped bar chart with color indicating building name and facet for year if multiple years are present
-if not monthly_consumption_building.empty:
-    clustered_bar_chart_fig = px.bar(
-        monthly_consumption_building,
-        x='Month',
-        y=y_axis_column,
-        color='BuildingName',  # Differentiate by building using color
-        barmode='group',  # Group bars side-by-side for comparison
-        title=f"Monthly {y_axis_title} by Building for {selected_commodity} in {selected_campus}",
-        category_orders={"Month": ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                                   "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]}
+# The clustered bar chart and the time series below share one monthly aggregate
+@st.fragment
+def render_monthly_by_building(filters, y_axis_column, y_axis_title, data_version):
+    selected_campus, selected_commodity = filters[0], filters[1]
+    st.header(f"Monthly {y_axis_title} by Building for {selected_commodity} - {selected_campus}")
+    st.write("This clustered bar chart compares the monthly consumption of the selected commodity for different buildings, grouped by month.")
+
+    # Group by 'Month', 'BuildingName', and 'Year' to get the monthly consumption for each building per year
+    monthly_consumption_building = aggregate_by_building_month(filters, y_axis_column, data_version)
+
+    # Plotly groups the color column itself, so drop the buildings that are not in the chart
+    monthly_consumption_building['BuildingName'] = monthly_consumption_building['BuildingName'].cat.remove_unused_categories()
+
+    # Turn month numbers into an ordered categorical of month names
+    monthly_consumption_building['Month'] = pd.Categorical.from_codes(
+        monthly_consumption_building['Month'].to_numpy() - 1, categories=month_names, ordered=True
     )
 
-    # Customize layout for improved readability
-    clustered_bar_chart_fig.update_layout(
-        xaxis_title='Month',
-        yaxis_title=y_axis_title,
-        plot_bgcolor='rgba(0,0,0,0)',  # Transparent background
-        legend_title_text='Building',
-        xaxis_tickangle=-45,  # Rotate x-axis labels
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
+    # Create a grouped bar chart with color indicating building name and facet for year if multiple years are present
+    if not monthly_consumption_building.empty:
+        clustered_bar_chart_fig = px.bar(
+            monthly_consumption_building,
+            x='Month',
+            y=y_axis_column,
+            color='BuildingName',  # Differentiate by building using color
+            barmode='group',  # Group bars side-by-side for comparison
+            title=f"Monthly {y_axis_title} by Building for {selected_commodity} in {selected_campus}",
+            category_orders={"Month": month_names}
+        )
 
-    st.plotly_chart(clustered_bar_chart_fig, use_container_width=True)
-else:
-    st.info(f"No data available for the {y_axis_title} Clustered Bar Chart visualization.")
-
-# ---- Time Series Visualization: Monthly Consumption by Building and Year ----
-st.header(f"Monthly {y_axis_title} Time Series for Selected Buildings by Year")
-st.write("This time series visualization shows the monthly consumption of the selected buildings, with separate lines for each building and year.")
-
-# Ensure months are in the correct order (January to December)
-df_exploded['Month'] = df_exploded['DateRange'].dt.month
-
-# Group by 'Month', 'Year', and 'BuildingName' to get the monthly consumption for each building per year
-monthly_consumption_timeseries = df_exploded.groupby(['Year', 'Month', 'BuildingName'])[y_axis_column].sum().reset_index()
-
-# Map numeric months to their names
-monthly_consumption_timeseries['Month'] = monthly_consumption_timeseries['Month'].map({
-    1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
-    7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
-})
-
-# Create a new column to combine BuildingName and Year for unique line representation
-monthly_consumption_timeseries['Building-Year'] = monthly_consumption_timeseries['BuildingName'] + ' (' + monthly_consumption_timeseries['Year'].astype(str) + ')'
-
-# Create a line plot where each line represents a unique combination of BuildingName and Year
-if not monthly_consumption_timeseries.empty:
-    timeseries_fig = px.line(
-        monthly_consumption_timeseries,
-        x='Month',
-        y=y_axis_column,
-        color='Building-Year',  # Differentiate each line by Building-Year combination
-        title=f"Monthly {y_axis_title} Time Series for Selected Buildings by Year",
-        markers=True,
-        labels={y_axis_column: y_axis_title},
-        category_orders = {"Month": ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                                 "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]}
-    )
+        # Customize layout for improved readability
+        clustered_bar_chart_fig.update_layout(
+            xaxis_title='Month',
+            yaxis_title=y_axis_title,
+            plot_bgcolor='rgba(0,0,0,0)',  # Transparent background
+            legend_title_text='Building',
+            xaxis_tickangle=-45,  # Rotate x-axis labels
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+        )
 
-    # Customize the layout for better readability
-    timeseries_fig.update_layout(
-        xaxis_title='Month',
-        yaxis_title=y_axis_title,
-        plot_bgcolor='rgba(0,0,0,0)',  # Transparent background
-        xaxis_tickangle=-45,  # Rotate x-axis labels
-        showlegend=True,
-        legend_title_text="Building & Year",
-        #legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
+        st.plotly_chart(clustered_bar_chart_fig, use_container_width=True)
+    else:
+        st.info(f"No data available for the {y_axis_title} Clustered Bar Chart visualization.")
+
+    # ---- Time Series Visualization: Monthly Consumption by Building and Year ----
+    st.header(f"Monthly {y_axis_title} Time Series for Selected Buildings by Year")
+    st.write("This time series visualization shows the monthly consumption of the selected buildings, with separate lines for each building and year.")
+
+    # Reuse the monthly consumption per building and year from the clustered bar chart, adding
+    # a column that combines BuildingName and Year for unique line representation
+    monthly_consumption_timeseries = monthly_consumption_building.assign(**{
+        'Building-Year': monthly_consumption_building['BuildingName'].astype(str) + ' (' + monthly_consumption_building['Year'].astype(str) + ')'
+    })
+
+    # Create a line plot where each line represents a unique combination of BuildingName and Year
+    if not monthly_consumption_timeseries.empty:
+        timeseries_fig = px.line(
+            monthly_consumption_timeseries,
+            x='Month',
+            y=y_axis_column,
+            color='Building-Year',  # Differentiate each line by Building-Year combination
+            title=f"Monthly {y_axis_title} Time Series for Selected Buildings by Year",
+            markers=True,
+            labels={y_axis_column: y_axis_title},
+            category_orders = {"Month": month_names},
+            render_mode='webgl'
+        )
 
-    st.plotly_chart(timeseries_fig, use_container_width=True)
-else:
-    st.info(f"No data available for the {y_axis_title} Time Series visualization.")
+        # Customize the layout for better readability
+        timeseries_fig.update_layout(
+            xaxis_title='Month',
+            yaxis_title=y_axis_title,
+            plot_bgcolor='rgba(0,0,0,0)',  # Transparent background
+            xaxis_tickangle=-45,  # Rotate x-axis labels
+            showlegend=True,
+            legend_title_text="Building & Year",
+            #legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+        )
+
+        st.plotly_chart(timeseries_fig, use_container_width=True)
+    else:
+        st.info(f"No data available for the {y_axis_title} Time Series visualization.")
+
+render_monthly_by_building(filters, y_axis_column, y_axis_title, data_version)
 
 # ---- Third Visualization: TotalConsumption by PrimaryUse and Year ----
-primaryuse_consumption = df_exploded.groupby(['Year', 'PrimaryUse'])[y_axis_column].sum().reset_index()
-
-st.header(f"{y_axis_title} by Primary Use and Year")
-st.write("This clustered bar chart compares the total consumption by the primary use of the building for different years.")
-
-if not primaryuse_consumption.empty:
-    primaryuse_bar_chart_fig = px.bar(
-        primaryuse_consumption,
-        x='PrimaryUse',
-        y=y_axis_column,
-        color='Year',
-        barmode='group',
-        title=f"Total {y_axis_title} by Primary Use and Year"
-    )
+@st.fragment
+def render_primary_use(filters, y_axis_column, y_axis_title, data_version):
+    st.header(f"{y_axis_title} by Primary Use and Year")
+    st.write("This clustered bar chart compares the total consumption by the primary use of the building for different years.")
 
-    primaryuse_bar_chart_fig.update_layout(
-        xaxis_title='Primary Use',
-        yaxis_title=y_axis_title,
-        plot_bgcolor='rgba(0,0,0,0)'  # Transparent background
-    )
+    # Only aggregate once the chart is switched on; the toggle reruns just this fragment
+    if not st.toggle("Show chart", key='show_primary_use'):
+        return
 
-    st.plotly_chart(primaryuse_bar_chart_fig, use_container_width=True)
-else:
-    st.info(f"No data available for the {y_axis_title} by Primary Use visualization.")
+    primaryuse_consumption = aggregate_by_primary_use(filters, y_axis_column, data_version)
+
+    if not primaryuse_consumption.empty:
+        primaryuse_bar_chart_fig = px.bar(
+            primaryuse_consumption,
+            x='PrimaryUse',
+            y=y_axis_column,
+            color='Year',
+            barmode='group',
+            title=f"Total {y_axis_title} by Primary Use and Year"
+        )
+
+        primaryuse_bar_chart_fig.update_layout(
+            xaxis_title='Primary Use',
+            yaxis_title=y_axis_title,
+            plot_bgcolor='rgba(0,0,0,0)'  # Transparent background
+        )
+
+        st.plotly_chart(primaryuse_bar_chart_fig, use_container_width=True)
+    else:
+        st.info(f"No data available for the {y_axis_title} by Primary Use visualization.")
+
+render_primary_use(filters, y_axis_column, y_axis_title, data_version)
 
 # ---- Fourth Visualization: Scatterplot of Total Consumption versus Building Size ----
-if 'BuildingSizeSQFT' in df_exploded.columns and 'TotalCost' in df_exploded.columns:
+@st.fragment
+def render_building_size(filters, y_axis_column, y_axis_title, data_version):
+    selected_campus, selected_commodity = filters[0], filters[1]
     st.header(f"{y_axis_title} vs Building Size (Bubble size represents TotalCost)")
 
-    consumption_building_size = df_exploded.groupby('BuildingName').agg({
-        y_axis_column: 'sum',
-        'TotalCost': 'sum',
-        'BuildingSizeSQFT': 'first'
-    }).reset_index()
+    # Only aggregate once the chart is switched on; the toggle reruns just this fragment
+    if not st.toggle("Show chart", key='show_building_size'):
+        return
+
+    consumption_building_size = aggregate_by_building(filters, y_axis_column, data_version)
 
     if not consumption_building_size.empty:
         scatterplot_fig = px.scatter(
@@ -308,7 +474,8 @@ if 'BuildingSizeSQFT' in df_exploded.columns and 'TotalCost' in df_exploded.colu
             y=y_axis_column,
             size='TotalCost',
             hover_name='BuildingName',
-            title=f"Total {y_axis_title} vs Building Size for {selected_commodity} in {selected_campus}"
+            title=f"Total {y_axis_title} vs Building Size for {selected_commodity} in {selected_campus}",
+            render_mode='webgl'
         )
 
         scatterplot_fig.update_layout(
@@ -320,6 +487,9 @@ if 'BuildingSizeSQFT' in df_exploded.columns and 'TotalCost' in df_exploded.colu
         st.plotly_chart(scatterplot_fig, use_container_width=True)
     else:
         st.info(f"No data available for the {y_axis_title} vs Building Size scatterplot.")
+
+if 'BuildingSizeSQFT' in filtered_data.columns and 'TotalCost' in filtered_data.columns:
+    render_building_size(filters, y_axis_column, y_axis_title, data_version)
 else:
     st.warning("The dataset does not contain a 'BuildingSizeSQFT' column.")
 
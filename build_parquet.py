@@ -0,0 +1,39 @@
+"""One-time conversion of the dashboard's Excel inputs to Parquet.
+
+Run ``python build_parquet.py`` whenever utility.xlsx or tempdata.xlsx
+changes. app.py reads the .parquet files when they exist and falls back
+to the workbooks otherwise.
+"""
+import pandas as pd
+
+commodity_file = 'utility.xlsx'
+temperature_file = 'tempdata.xlsx'
+
+
+def to_arrow_friendly(df):
+    # Columns such as SerialNumber mix ints and strings, which Arrow can't store
+    for col in df.select_dtypes(include='object').columns:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def build_commodity(file_path):
+    df = pd.read_excel(file_path)
+    for date_col in ['BillStartDate', 'BillEndDate']:
+        if date_col in df.columns:
+            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
+    return to_arrow_friendly(df)
+
+
+def build_temperature(file_path):
+    df = pd.read_excel(file_path)
+    if 'Year-month' in df.columns:
+        df['Year-month'] = pd.to_datetime(df['Year-month'], format='%Y-%m')
+    return to_arrow_friendly(df)
+
+
+if __name__ == '__main__':
+    for file_path, build in [(commodity_file, build_commodity), (temperature_file, build_temperature)]:
+        parquet_path = file_path.rsplit('.', 1)[0] + '.parquet'
+        build(file_path).to_parquet(parquet_path, engine='pyarrow', index=False)
+        print(f"Wrote {parquet_path}")
@@ -7,6 +7,7 @@ setup(
         'streamlit~=1.39.0',
         'setuptools',
         'pandas~=2.0.3',
+        'pyarrow>=11.0',
         'plotly~=5.9.0',
         'xlrd~=2.0.1',
         'numpy~=1.24.3',